@@ -0,0 +1,70 @@
+"""
+Document loaders used by ingestion worker processes. Kept separate from rag_engine
+so spawned workers import only what parsing needs; parser libraries are imported
+inside each loader.
+"""
+from typing import List, Tuple
+from langchain_core.documents import Document
+
+
+def _load_pdf(path: str) -> List[Document]:
+    """Load a PDF page by page with PyMuPDF (0-based page numbers, like PyPDFLoader)"""
+    import fitz  # PyMuPDF
+    with fitz.open(path) as pdf:
+        return [
+            Document(page_content=page.get_text("text"),
+                     metadata={"source": path, "page": i})
+            for i, page in enumerate(pdf)
+        ]
+
+
+def _load_docx(path: str) -> List[Document]:
+    """Load a Word document, splitting by paragraphs to simulate pages"""
+    from langchain_community.document_loaders import Docx2txtLoader
+    documents = []
+    for doc in Docx2txtLoader(path).load():
+        paragraphs = doc.page_content.split('\n\n')
+        for idx, para in enumerate(paragraphs):
+            if para.strip():
+                documents.append(Document(
+                    page_content=para,
+                    metadata={"source": path, "page": f"Para-{idx+1}"}
+                ))
+    return documents
+
+
+def _load_xlsx(path: str) -> List[Document]:
+    """Load an Excel workbook as one document per sheet"""
+    import openpyxl
+    documents = []
+    # Read-only mode streams rows instead of materializing the whole workbook
+    wb = openpyxl.load_workbook(path, data_only=True, read_only=True)
+    try:
+        for sheet_idx, sheet in enumerate(wb.worksheets):
+            parts = [f"Sheet: {sheet.title}"]
+            parts.extend(
+                " | ".join("" if cell is None else str(cell) for cell in row)
+                for row in sheet.iter_rows(values_only=True)
+            )
+            text_content = "\n".join(part for part in parts if part.strip())
+            
+            documents.append(Document(
+                page_content=text_content,
+                metadata={"source": path, "page": f"Sheet-{sheet_idx+1}"}
+            ))
+    finally:
+        wb.close()
+    return documents
+
+
+_LOADERS = {"pdf": _load_pdf, "docx": _load_docx, "xlsx": _load_xlsx}
+
+
+def load_file(kind_and_path: Tuple[str, str]) -> List[Document]:
+    """Worker entry point: dispatch to the loader for the file type (must be module-level to pickle)"""
+    kind, path = kind_and_path
+    try:
+        return _LOADERS[kind](path)
+    except Exception as e:
+        print(f"  Error loading {path}: {e}")
+        return []
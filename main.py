@@ -1,16 +1,30 @@
 import os
 import shutil
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional, TYPE_CHECKING
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse, FileResponse
 from pydantic import BaseModel
-from rag_engine import ImprovedRAGService
 
-app = FastAPI()
+if TYPE_CHECKING:
+    from rag_engine import ImprovedRAGService
 
-# Initialize RAG Service
-rag_service = ImprovedRAGService()
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+rag_service: Optional["ImprovedRAGService"] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize RAG Service at startup, not at import: ingestion worker processes
+    # re-import this module and must not load the models/index again
+    global rag_service
+    from rag_engine import ImprovedRAGService
+    rag_service = ImprovedRAGService()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 class ChatRequest(BaseModel):
     message: str
@@ -34,8 +48,9 @@ async def upload_files(files: List[UploadFile] = File(...)):
     uploaded_files = []
     for file in files:
         file_path = os.path.join(rag_service.data_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Unbuffered destination + 1 MiB copy chunks keep syscall count low for large RFPs
+        with open(file_path, "wb", buffering=0) as buffer:
+            shutil.copyfileobj(file.file, buffer, length=UPLOAD_CHUNK_SIZE)
         uploaded_files.append(file.filename)
     
     return {"message": f"Successfully uploaded {len(uploaded_files)} files", "files": uploaded_files}
@@ -54,7 +69,10 @@ async def ingest_documents(request: IngestRequest = IngestRequest()):
 @app.post("/chat")
 async def chat(request: ChatRequest):
     try:
-        result = rag_service.query(
+        # query() blocks (embedding, FAISS, LLM calls); run it off the event loop so
+        # concurrent /chat requests are served in parallel
+        result = await run_in_threadpool(
+            rag_service.query,
             request.message,
             top_k=request.top_k,
             temperature=request.temperature,
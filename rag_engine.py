@@ -1,16 +1,165 @@
 import os
+import uuid
+import shutil
+import tempfile
+import pickle
+import functools
 import glob as file_glob
-from typing import List, Dict, Tuple
+import multiprocessing
+import threading
+from collections import OrderedDict
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, TYPE_CHECKING
+import numpy as np
+import faiss
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader, Docx2txtLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from rank_bm25 import BM25Okapi
+from doc_loaders import load_file
+from sentence_transformers import SentenceTransformer
+import onnxruntime as ort
+
+if TYPE_CHECKING:
+    from rag_evaluator import RAGEvaluator
 
 load_dotenv()
 
+# Candidates taken from each of the dense and sparse rankings before fusion
+HYBRID_FETCH_K = 50
+# Reciprocal Rank Fusion damping constant
+RRF_K = 60
+
+# Max number of per-temperature Gemini clients kept alive
+LLM_CACHE_SIZE = 8
+
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", "! ", "? ", "; ", ": ", ", ", " ", ""]
+
+
+# IMPROVEMENT 7 prompt, kept as constant fragments around the context/question
+# so each query builds the prompt with a single join
+_PROMPT_PRE = """You are a helpful AI assistant analyzing documents. Answer the question using ONLY the provided context sources.
+
+INSTRUCTIONS:
+1. Read all context sources carefully
+2. Think step-by-step about how to answer the question
+3. Cite specific sources when making claims (e.g., "According to Source 1...")
+4. If the answer requires information from multiple sources, synthesize them
+5. If the context doesn't contain enough information, say "The provided documents don't contain sufficient information to answer this question."
+6. Be precise and factual - do not add information not in the context
+
+CONTEXT SOURCES:
+"""
+_PROMPT_MID = """
+
+QUESTION: """
+_PROMPT_POST = """
+
+REASONING PROCESS:
+Let me analyze this step by step:
+1. What is the question asking?
+2. Which sources contain relevant information?
+3. What is the answer based on these sources?
+
+ANSWER (with source citations):"""
+
+
+_evaluator_singleton: Optional["RAGEvaluator"] = None
+_evaluator_lock = threading.Lock()  # /chat runs query() on a thread pool
+
+
+def _get_evaluator() -> "RAGEvaluator":
+    """Import and build the evaluator on first use, then reuse it for every query"""
+    global _evaluator_singleton
+    if _evaluator_singleton is None:
+        with _evaluator_lock:
+            if _evaluator_singleton is None:
+                from rag_evaluator import RAGEvaluator
+                _evaluator_singleton = RAGEvaluator()
+    return _evaluator_singleton
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercased whitespace tokens for the BM25 index"""
+    return text.lower().split()
+
+
+def _ort_session_options() -> ort.SessionOptions:
+    """ONNX Runtime session tuned for CPU inference (all cores, full graph fusion)"""
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = os.cpu_count() or 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+class OnnxSentenceEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by Sentence Transformers running on ONNX Runtime
+    instead of PyTorch eager. Model files are cached in `cache_dir` so they are
+    only downloaded/exported once.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = "model_cache",
+                 file_name: str = "onnx/model.onnx", batch_size: int = 64,
+                 query_cache_size: int = 1024):
+        self.batch_size = batch_size
+        # Repeated questions (UI retries, evaluation runs) skip the transformer forward pass
+        self._encode_query_cached = functools.lru_cache(maxsize=query_cache_size)(self._encode_query)
+        self.model = SentenceTransformer(
+            model_name,
+            device="cpu",
+            backend="onnx",
+            cache_folder=cache_dir,
+            model_kwargs={
+                "file_name": file_name,
+                "provider": "CPUExecutionProvider",
+                "session_options": _ort_session_options(),
+            },
+        )
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """Encode texts in large batches, returning a float32 matrix (one row per text)"""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            show_progress_bar=show_progress_bar,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def _encode_query(self, normalized_text: str) -> np.ndarray:
+        vector = self.model.encode(normalized_text, normalize_embeddings=True, convert_to_numpy=True)
+        vector = vector.astype(np.float32, copy=False)
+        vector.setflags(write=False)  # Shared by every cache hit
+        return vector
+
+    def embed_query_vector(self, text: str) -> np.ndarray:
+        """Cached query embedding, keyed by the normalized question text"""
+        return self._encode_query_cached(text.strip().lower())
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_vector(text).tolist()
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    @property
+    def max_tokens(self) -> int:
+        """Longest input (excluding [CLS]/[SEP]) the model embeds without truncation"""
+        return self.model.max_seq_length - 2
+
+
 class ImprovedRAGService:
     def __init__(self, data_dir: str = "data", index_dir: str = "faiss_index"):
         self.data_dir = data_dir
@@ -19,37 +168,82 @@ class ImprovedRAGService:
         self.chunk_size = int(os.getenv("CHUNK_SIZE", "800"))  # Reduced for better precision
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "150"))
         self.top_k = int(os.getenv("TOP_K_RESULTS", "8"))  # Increased for reranking
+        self.embed_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+        self.index_type = os.getenv("FAISS_INDEX_TYPE", "hnsw").lower()  # "hnsw" or "flat"
+        # Dynamically INT8-quantized graph; set to onnx/model.onnx for FP32
+        self.embedding_onnx_file = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
         
         print(f"Improved RAG Configuration:")
         print(f"  Chunk Size: {self.chunk_size}")
         print(f"  Chunk Overlap: {self.chunk_overlap}")
         print(f"  Top K Results: {self.top_k}")
+        print(f"  Embedding ONNX File: {self.embedding_onnx_file}")
+        print(f"  FAISS Index Type: {self.index_type}")
         
-        # IMPROVEMENT 1: Better embedding model with higher dimensions
-        self.embeddings = HuggingFaceEmbeddings(
+        # IMPROVEMENT 1: Better embedding model with higher dimensions,
+        # served through ONNX Runtime (normalized embeddings improve similarity search)
+        self.embeddings = OnnxSentenceEmbeddings(
             model_name="sentence-transformers/all-mpnet-base-v2",  # 768-dim vs 384-dim
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}  # Improves similarity search
+            cache_dir=os.getenv("EMBEDDING_CACHE_DIR", "model_cache"),
+            file_name=self.embedding_onnx_file
         )
         
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash", 
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        # Gemini clients keyed by temperature, reused across queries (bounded LRU)
+        self._llm_by_temp: "OrderedDict[float, ChatGoogleGenerativeAI]" = OrderedDict()
+        self._llm_lock = threading.Lock()  # Queries run concurrently on the server's thread pool
         self.vector_store = None
+        self.bm25: Optional[BM25Okapi] = None  # Sparse index aligned with FAISS index positions
         self._load_index_if_exists()
 
     def _load_index_if_exists(self):
         if os.path.exists(self.index_dir):
             try:
-                self.vector_store = FAISS.load_local(
-                    self.index_dir, 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
+                index = faiss.read_index(os.path.join(self.index_dir, "index.faiss"))
+                with open(os.path.join(self.index_dir, "index.pkl"), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                self.vector_store = FAISS(
+                    embedding_function=self.embeddings,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=index_to_docstore_id,
+                    # Indexes built before the switch to inner product are still L2
+                    distance_strategy=(
+                        DistanceStrategy.MAX_INNER_PRODUCT
+                        if index.metric_type == faiss.METRIC_INNER_PRODUCT
+                        else DistanceStrategy.EUCLIDEAN_DISTANCE
+                    )
                 )
                 print(f"Loaded existing FAISS index from {self.index_dir}")
             except Exception as e:
                 print(f"Could not load index: {e}")
+            
+            bm25_path = os.path.join(self.index_dir, "bm25.pkl")
+            if os.path.exists(bm25_path):
+                try:
+                    with open(bm25_path, "rb") as f:
+                        self.bm25 = pickle.load(f)
+                except Exception as e:
+                    # Retrieval falls back to dense-only ranking
+                    print(f"Could not load BM25 index: {e}")
+                    self.bm25 = None
+
+    def _get_llm(self, temperature: float) -> ChatGoogleGenerativeAI:
+        """Return a cached client for the temperature (rounded to 1 decimal)"""
+        temperature = round(temperature, 1)
+        with self._llm_lock:
+            llm = self._llm_by_temp.get(temperature)
+            if llm is None:
+                llm = ChatGoogleGenerativeAI(
+                    model="gemini-2.5-flash", 
+                    google_api_key=os.getenv("GOOGLE_API_KEY"),
+                    temperature=temperature
+                )
+                self._llm_by_temp[temperature] = llm
+                if len(self._llm_by_temp) > LLM_CACHE_SIZE:
+                    self._llm_by_temp.popitem(last=False)
+            else:
+                self._llm_by_temp.move_to_end(temperature)
+        return llm
 
     def _chunk_with_page_tracking(self, documents: List[Document], 
                                    chunk_size: int, chunk_overlap: int) -> List[Document]:
@@ -59,111 +253,131 @@ class ImprovedRAGService:
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ": ", ", ", " ", ""],
+            separators=CHUNK_SEPARATORS,
             length_function=len,
-            is_separator_regex=False
+            is_separator_regex=False,
+            add_start_index=True  # Splitter tracks each chunk's offset with a moving cursor
+        )
+        # Character limits don't bound token counts (tables, non-English text), so
+        # chunks longer than the embedding model's window are re-split by tokens
+        max_tokens = self.embeddings.max_tokens
+        token_splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+            self.embeddings.tokenizer,
+            chunk_size=max_tokens,
+            chunk_overlap=max_tokens // 8,
+            separators=CHUNK_SEPARATORS,
+            add_start_index=True
+        )
+        
+        # Split every document in one batch call, tagging chunks with their parent's index
+        split_docs = text_splitter.create_documents(
+            [doc.page_content for doc in documents],
+            metadatas=[{"doc_index": idx} for idx in range(len(documents))]
         )
+        split_docs = self._split_oversized(split_docs, token_splitter, max_tokens)
         
         all_chunks = []
-        for doc in documents:
+        # Chunks of the same document are contiguous, so enrich them group by group
+        for doc_index, group in groupby(split_docs, key=lambda chunk: chunk.metadata["doc_index"]):
+            chunks = list(group)
+            doc = documents[doc_index]
+            
             # Get source file and page info
             source = doc.metadata.get("source", "Unknown")
             page = doc.metadata.get("page", None)
             
-            # Split the document
-            chunks = text_splitter.split_text(doc.page_content)
-            
             # Calculate character position for page tracking
             total_chars = len(doc.page_content)
             
             for i, chunk in enumerate(chunks):
-                # Find chunk position in original document
-                chunk_start = doc.page_content.find(chunk)
+                chunk_start = chunk.metadata["start_index"]
                 chunk_position = chunk_start / total_chars if total_chars > 0 else 0
                 
                 # Create metadata with enhanced info
-                chunk_metadata = {
+                chunk.metadata = {
                     "source": source,
                     "page": page if page is not None else "N/A",
                     "chunk_id": i,
                     "chunk_position": chunk_position,
                     "total_chunks": len(chunks),
                     # Add first 100 chars as preview for debugging
-                    "preview": chunk[:100].replace("\n", " ")
+                    "preview": chunk.page_content[:100].replace("\n", " ")
                 }
-                
-                all_chunks.append(Document(
-                    page_content=chunk,
-                    metadata=chunk_metadata
-                ))
+                all_chunks.append(chunk)
         
         return all_chunks
 
+    def _split_oversized(self, chunks: List[Document], token_splitter: RecursiveCharacterTextSplitter,
+                         max_tokens: int) -> List[Document]:
+        """Re-split any chunk that would be silently truncated by the embedding model"""
+        if not chunks:
+            return chunks
+        token_counts = [
+            len(ids) for ids in self.embeddings.tokenizer(
+                [chunk.page_content for chunk in chunks], add_special_tokens=False
+            )["input_ids"]
+        ]
+        if max(token_counts) <= max_tokens:
+            return chunks
+        
+        result = []
+        for chunk, n_tokens in zip(chunks, token_counts):
+            if n_tokens > max_tokens:
+                sub_chunks = token_splitter.create_documents([chunk.page_content], [chunk.metadata])
+                for sub_chunk in sub_chunks:
+                    # Sub-chunk offsets are relative to the oversized chunk
+                    sub_chunk.metadata["start_index"] += chunk.metadata["start_index"]
+                result.extend(sub_chunks)
+            else:
+                result.append(chunk)
+        return result
+
+    def _build_vector_store(self, texts: List[Document], vectors: np.ndarray) -> FAISS:
+        """
+        Build the FAISS store from precomputed embeddings.
+        HNSW gives sublinear top-k search on large corpora; "flat" keeps exact brute-force search.
+        Vectors are unit-norm, so inner product equals cosine similarity.
+        """
+        vectors = np.array(vectors, dtype=np.float32, order="C")
+        faiss.normalize_L2(vectors)
+        dim = vectors.shape[1]
+        if self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+        else:
+            index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+        
+        ids = [str(uuid.uuid4()) for _ in texts]
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, texts))),
+            index_to_docstore_id=dict(enumerate(ids)),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+
     def ingest_folder(self, chunk_size: int = 800, chunk_overlap: int = 150):
         print(f"Scanning {self.data_dir} for documents...")
         
         all_documents = []
         
-        # Load PDF files with page tracking
-        try:
-            pdf_files = file_glob.glob(os.path.join(self.data_dir, "**/*.pdf"), recursive=True)
-            for pdf_file in pdf_files:
-                try:
-                    loader = PyPDFLoader(pdf_file)
-                    docs = loader.load()
-                    all_documents.extend(docs)
-                except Exception as e:
-                    print(f"  Error loading {pdf_file}: {e}")
-            print(f"  Found {len(pdf_files)} PDF documents")
-        except Exception as e:
-            print(f"  No PDF files found or error: {e}")
+        # Parse all files in parallel worker processes (PyMuPDF is not thread-safe and
+        # DOCX/XLSX parsing is CPU-bound Python)
+        file_patterns = [("pdf", "PDF"), ("docx", "Word"), ("xlsx", "Excel")]
+        all_paths = []
+        for ext, label in file_patterns:
+            files = file_glob.glob(os.path.join(self.data_dir, f"**/*.{ext}"), recursive=True)
+            all_paths.extend((ext, path) for path in files)
+            print(f"  Found {len(files)} {label} documents")
         
-        # Load DOCX files (manually add paragraph numbers as "pages")
-        try:
-            docx_files = file_glob.glob(os.path.join(self.data_dir, "**/*.docx"), recursive=True)
-            for docx_file in docx_files:
-                try:
-                    loader = Docx2txtLoader(docx_file)
-                    docs = loader.load()
-                    # Split by paragraphs to simulate pages
-                    for doc in docs:
-                        paragraphs = doc.page_content.split('\n\n')
-                        for idx, para in enumerate(paragraphs):
-                            if para.strip():
-                                all_documents.append(Document(
-                                    page_content=para,
-                                    metadata={"source": docx_file, "page": f"Para-{idx+1}"}
-                                ))
-                except Exception as e:
-                    print(f"  Error loading {docx_file}: {e}")
-            print(f"  Found {len(docx_files)} Word documents")
-        except Exception as e:
-            print(f"  No Word files found or error: {e}")
-        
-        # Load XLSX files
-        try:
-            import openpyxl
-            xlsx_files = file_glob.glob(os.path.join(self.data_dir, "**/*.xlsx"), recursive=True)
-            for xlsx_file in xlsx_files:
-                try:
-                    wb = openpyxl.load_workbook(xlsx_file, data_only=True)
-                    for sheet_idx, sheet in enumerate(wb.worksheets):
-                        text_content = f"Sheet: {sheet.title}\n"
-                        for row in sheet.iter_rows(values_only=True):
-                            row_text = " | ".join([str(cell) if cell is not None else "" for cell in row])
-                            if row_text.strip():
-                                text_content += row_text + "\n"
-                        
-                        doc = Document(
-                            page_content=text_content,
-                            metadata={"source": xlsx_file, "page": f"Sheet-{sheet_idx+1}"}
-                        )
-                        all_documents.append(doc)
-                except Exception as e:
-                    print(f"  Error loading {xlsx_file}: {e}")
-            print(f"  Found {len(xlsx_files)} Excel documents")
-        except Exception as e:
-            print(f"  No Excel files found or error: {e}")
+        if all_paths:
+            # Spawned workers only import the lightweight doc_loaders module (no
+            # ONNX/FAISS/torch), and spawn behaves the same on every platform
+            with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                for docs in executor.map(load_file, all_paths):
+                    all_documents.extend(docs)
         
         if not all_documents:
             return "No documents found in data directory."
@@ -174,34 +388,69 @@ class ImprovedRAGService:
         texts = self._chunk_with_page_tracking(all_documents, chunk_size, chunk_overlap)
 
         print(f"Creating embeddings for {len(texts)} chunks...")
-        self.vector_store = FAISS.from_documents(texts, self.embeddings)
+        # Encode all chunks in large batches, then build the index from the precomputed vectors
+        page_contents = [t.page_content for t in texts]
+        vectors = self.embeddings.encode(
+            page_contents,
+            batch_size=self.embed_batch_size,
+            show_progress_bar=True
+        )
+        self.vector_store = self._build_vector_store(texts, vectors)
+        # BM25 corpus order matches FAISS insertion order, so positions line up
+        self.bm25 = BM25Okapi([_tokenize(t.page_content) for t in texts])
         
-        self.vector_store.save_local(self.index_dir)
+        self._save_index()
         
         return f"Successfully ingested {len(all_documents)} documents and created {len(texts)} chunks (Size: {chunk_size}, Overlap: {chunk_overlap})."
 
-    def _rerank_chunks(self, query: str, chunks: List[Document], top_n: int = 5) -> List[Document]:
+    def _save_index(self):
+        """
+        Write the index files to a temp dir, then rename them into place, so a failed
+        save never leaves a half-written index behind.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.index_dir)
+        try:
+            self.vector_store.save_local(tmp_dir)
+            with open(os.path.join(tmp_dir, "bm25.pkl"), "wb") as f:
+                pickle.dump(self.bm25, f)
+            for name in os.listdir(tmp_dir):
+                os.replace(os.path.join(tmp_dir, name), os.path.join(self.index_dir, name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _hybrid_search(self, query: str, query_vector: np.ndarray,
+                       fetch_k: int, top_n: int = 5) -> List[Document]:
         """
-        IMPROVEMENT 4: Simple reranking based on keyword matching
-        This helps surface chunks that have exact keyword matches
+        IMPROVEMENT 4: Hybrid retrieval - dense (FAISS) and sparse (BM25) rankings
+        fused with Reciprocal Rank Fusion. Chunks with exact keyword matches surface
+        without discarding the semantic ranking.
         """
-        query_terms = set(query.lower().split())
+        index = self.vector_store.index
+        fetch_k = min(fetch_k, index.ntotal)
+        if fetch_k == 0:
+            return []
         
-        scored_chunks = []
-        for chunk in chunks:
-            # Calculate keyword overlap score
-            chunk_terms = set(chunk.page_content.lower().split())
-            keyword_score = len(query_terms.intersection(chunk_terms)) / len(query_terms)
-            
-            # Combine with original similarity (chunks are already sorted by similarity)
-            # Give 70% weight to original similarity, 30% to keyword matching
-            scored_chunks.append((chunk, keyword_score))
+        _, dense_ids = index.search(query_vector.reshape(1, -1), fetch_k)
+        rankings = [[int(i) for i in dense_ids[0] if i != -1]]
+        
+        if self.bm25 is not None:
+            sparse_scores = self.bm25.get_scores(_tokenize(query))
+            top_ids = np.argpartition(-sparse_scores, fetch_k - 1)[:fetch_k]
+            top_ids = top_ids[np.argsort(-sparse_scores[top_ids])]
+            # Chunks sharing no query term carry no sparse signal
+            rankings.append([int(i) for i in top_ids if sparse_scores[i] > 0])
         
-        # Re-sort by keyword score
-        scored_chunks.sort(key=lambda x: x[1], reverse=True)
+        fused_scores: Dict[int, float] = {}
+        for ranking in rankings:
+            for rank, idx in enumerate(ranking, 1):
+                fused_scores[idx] = fused_scores.get(idx, 0.0) + 1.0 / (RRF_K + rank)
         
-        # Return top N
-        return [chunk for chunk, score in scored_chunks[:top_n]]
+        best_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)[:top_n]
+        return [
+            self.vector_store.docstore.search(self.vector_store.index_to_docstore_id[i])
+            for i in best_ids
+        ]
 
     def _deduplicate_sources(self, sources: List[Dict]) -> List[Dict]:
         """Remove duplicate source citations"""
@@ -224,71 +473,60 @@ class ImprovedRAGService:
             }
         
         # IMPROVEMENT 5: Retrieve more chunks for reranking
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": top_k})
-        docs = retriever.invoke(question)
+        fetch_k = max(top_k, HYBRID_FETCH_K)
+        query_vector = self.embeddings.embed_query_vector(question)
+        if isinstance(self.vector_store.index, faiss.IndexHNSW):
+            # Wider beam than fetch_k keeps HNSW recall close to exact search
+            self.vector_store.index.hnsw.efSearch = max(fetch_k * 4, 64)
         
-        # Rerank to get best 5 chunks
-        reranked_docs = self._rerank_chunks(question, docs, top_n=5)
+        # Fuse dense and BM25 candidates to get best 5 chunks
+        reranked_docs = self._hybrid_search(question, query_vector, fetch_k=fetch_k, top_n=5)
         
-        # IMPROVEMENT 6: Enhanced context assembly with section markers
-        context_parts = []
+        # Source citations kept as parallel arrays (file, page, preview per chunk)
+        files, pages, previews = [], [], []
+        for doc in reranked_docs:
+            files.append(doc.metadata.get("source", "Unknown").split('\\')[-1].split('/')[-1])
+            pages.append(doc.metadata.get("page", "N/A"))
+            previews.append(doc.metadata.get("preview", "")[:100])
+        
+        # IMPROVEMENT 6: Enhanced context assembly with section markers.
+        # Pieces go straight into one buffer and are joined once (no per-chunk f-string copy)
+        buf = []
+        ap = buf.append
         for i, doc in enumerate(reranked_docs, 1):
-            source_file = doc.metadata.get("source", "Unknown").split('\\')[-1].split('/')[-1]
-            page = doc.metadata.get("page", "N/A")
-            
-            context_parts.append(
-                f"[Source {i}: {source_file}, Page {page}]\n{doc.page_content}\n"
-            )
+            if i > 1:
+                ap("\n---\n")
+            ap("[Source ")
+            ap(str(i))
+            ap(": ")
+            ap(files[i-1])
+            ap(", Page ")
+            ap(str(pages[i-1]))
+            ap("]\n")
+            ap(doc.page_content)
+            ap("\n")
         
-        context = "\n---\n".join(context_parts)
+        context = "".join(buf)
         contexts_list = [doc.page_content for doc in reranked_docs]
         
-        # Extract sources with deduplication and source IDs
-        sources = []
-        for i, doc in enumerate(reranked_docs, 1):
-            source_info = {
+        # Extract sources with source IDs
+        sources = [
+            {
                 "source_id": i,  # NEW: Add source ID for citation matching
-                "file": doc.metadata.get("source", "Unknown").split('\\')[-1].split('/')[-1],
-                "page": doc.metadata.get("page", "N/A"),
-                "preview": doc.metadata.get("preview", "")[:100]
+                "file": file,
+                "page": page,
+                "preview": preview
             }
-            sources.append(source_info)
+            for i, (file, page, preview) in enumerate(zip(files, pages, previews), 1)
+        ]
         
         # Note: We don't deduplicate here to preserve source_id mapping
         # If Source 3 in answer maps to sources[2], deduplication would break this
         
-        # IMPROVEMENT 7: Enhanced prompt with reasoning and citation instructions
-        prompt_text = f"""You are a helpful AI assistant analyzing documents. Answer the question using ONLY the provided context sources.
-
-INSTRUCTIONS:
-1. Read all context sources carefully
-2. Think step-by-step about how to answer the question
-3. Cite specific sources when making claims (e.g., "According to Source 1...")
-4. If the answer requires information from multiple sources, synthesize them
-5. If the context doesn't contain enough information, say "The provided documents don't contain sufficient information to answer this question."
-6. Be precise and factual - do not add information not in the context
-
-CONTEXT SOURCES:
-{context}
-
-QUESTION: {question}
-
-REASONING PROCESS:
-Let me analyze this step by step:
-1. What is the question asking?
-2. Which sources contain relevant information?
-3. What is the answer based on these sources?
-
-ANSWER (with source citations):"""
-        
-        # Create LLM with dynamic temperature
-        dynamic_llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash", 
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=temperature
-        )
+        # IMPROVEMENT 7: Enhanced prompt with reasoning and citation instructions (see _PROMPT_PRE)
+        prompt_text = "".join((_PROMPT_PRE, context, _PROMPT_MID, question, _PROMPT_POST))
         
-        response = dynamic_llm.invoke(prompt_text)
+        response = self._get_llm(temperature).invoke(prompt_text)
         
         result = {
             "answer": response.content,
@@ -298,8 +536,7 @@ ANSWER (with source citations):"""
         
         # Run evaluation if requested
         if evaluate:
-            from rag_evaluator import RAGEvaluator
-            evaluator = RAGEvaluator()
+            evaluator = _get_evaluator()
             evaluation = evaluator.comprehensive_evaluation(
                 query=question,
                 answer=response.content,
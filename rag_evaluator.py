@@ -1,76 +1,485 @@
 import os
+import re
 import json
-from typing import List, Dict, Any
+import asyncio
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Type
+import numpy as np
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-import re
+import orjson
+from pydantic import BaseModel, Field, ValidationError
+
+@functools.lru_cache(maxsize=1)
+def _load_env():
+    load_dotenv()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_genai():
+    """Gemini SDK, imported and configured on first use (gRPC/protobuf init is slow)"""
+    _load_env()
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+
+@functools.lru_cache(maxsize=1)
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Long-lived event loop on a daemon thread for evaluator coroutines. Async LLM
+    clients bind to the loop they first run on, so every call must reuse one loop.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="rag-evaluator-loop", daemon=True).start()
+    return loop
+
+
+# Entries kept in the in-process exact prompt cache
+PROMPT_CACHE_SIZE = 1024
+
+try:
+    from blake3 import blake3 as _blake3
+    
+    def _prompt_digest(prompt: str) -> bytes:
+        """128-bit content hash of the prompt"""
+        return _blake3(prompt.encode("utf-8")).digest(length=16)
+except ImportError:
+    def _prompt_digest(prompt: str) -> bytes:
+        """128-bit content hash of the prompt"""
+        return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+
+
+# Note: the Gemini API orders response-schema properties alphabetically (the
+# google-generativeai conversion sets no propertyOrdering), so field order here
+# does not decide output order. Fast mode streams without a schema instead.
+class ContextRelevance(BaseModel):
+    average_score: float = Field(description="Mean of the individual scores")
+    individual_scores: List[float] = Field(description="Relevance score (0.0-1.0) of each context, in order")
+    reasoning: str = Field(description="Which contexts address the query and which don't, and why")
+    verdict: str = Field(description="PASS if average_score >= 0.7, otherwise FAIL")
+
+
+class Faithfulness(BaseModel):
+    score: float = Field(description="Share of answer claims supported by the contexts (0.0-1.0)")
+    supported_claims: List[str] = Field(description="Claims supported by the contexts, with the context they come from")
+    unsupported_claims: List[str] = Field(description="Claims NOT found in the contexts (hallucinations)")
+    reasoning: str = Field(description="Short justification of the score")
+    verdict: str = Field(description="FAITHFUL if score >= 0.8, otherwise UNFAITHFUL")
+
+
+class AnswerRelevance(BaseModel):
+    score: float = Field(description="How well the answer addresses the query (0.0-1.0)")
+    addresses_query: bool = Field(description="Whether the answer directly addresses what was asked")
+    missing_aspects: List[str] = Field(description="Parts of the question the answer doesn't cover")
+    irrelevant_content: List[str] = Field(description="Content in the answer unrelated to the query")
+    reasoning: str = Field(description="Short justification of the score")
+    verdict: str = Field(description="RELEVANT if score >= 0.7, otherwise IRRELEVANT")
+
+
+class CitationQuality(BaseModel):
+    score: float = Field(description="How well claims are traced to sources (0.0-1.0)")
+    has_citations: bool = Field(description="Whether the answer references any sources")
+    citation_examples: List[str] = Field(description="Examples of citations used in the answer")
+    uncited_claims: List[str] = Field(description="Claims that lack a source reference")
+    reasoning: str = Field(description="Short justification of the score")
+    verdict: str = Field(description="GOOD if score >= 0.6, otherwise POOR")
+
+
+class AllMetrics(BaseModel):
+    context_relevance: ContextRelevance
+    faithfulness: Faithfulness
+    answer_relevance: AnswerRelevance
+    citation_quality: CitationQuality
+
+
+METRIC_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "context_relevance": ContextRelevance,
+    "faithfulness": Faithfulness,
+    "answer_relevance": AnswerRelevance,
+    "citation_quality": CitationQuality,
+    "all": AllMetrics,
+}
+
+_CONTEXT_RELEVANCE_RUBRIC = """For each context, rate its relevance on a scale of 0.0 to 1.0 where:
+- 0.0-0.3: Completely irrelevant
+- 0.4-0.6: Somewhat relevant but missing key information
+- 0.7-0.8: Relevant with some useful information
+- 0.9-1.0: Highly relevant and directly answers the query"""
+
+_FAITHFULNESS_RUBRIC = """Analyze each statement in the answer:
+- Is it directly supported by the contexts?
+- Is it a reasonable inference from the contexts?
+- Is it added information not in contexts (hallucination)?"""
+
+_ANSWER_RELEVANCE_RUBRIC = """Consider:
+- Does the answer directly address what was asked?
+- Is the answer complete or does it miss important aspects of the question?
+- Does it contain unnecessary information not related to the query?"""
+
+_CITATION_QUALITY_RUBRIC = """Check:
+- Does the answer reference specific sources when making claims?
+- Are the citations appropriate and helpful?
+- Can we trace claims back to sources?"""
+
+@functools.lru_cache(maxsize=4)
+def _get_model(model: str, temperature: float):
+    """Shared Gemini model per (model, temperature), reused across evaluator instances"""
+    return _get_genai().GenerativeModel(
+        model,
+        generation_config={"temperature": temperature, "response_mime_type": "application/json"}
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _generation_config(metric: str):
+    """Per-metric JSON mode config: the SDK turns the Pydantic model into a response schema"""
+    return _get_genai().GenerationConfig(
+        response_mime_type="application/json", response_schema=METRIC_SCHEMAS[metric]
+    )
+
+async def _close_stream(stream):
+    """
+    Cancel the RPC behind a streamed Gemini response. The SDK has no public close,
+    so this reaches for the wrapped gRPC call (cancel) or async iterator (aclose).
+    """
+    iterator = getattr(stream, "_iterator", None)
+    if callable(getattr(iterator, "cancel", None)):
+        iterator.cancel()
+    elif callable(getattr(iterator, "aclose", None)):
+        await iterator.aclose()
+    else:
+        _warn_stream_not_cancelled()
+
+
+@functools.lru_cache(maxsize=1)
+def _warn_stream_not_cancelled():
+    """Printed once: SDK internals changed, so fast mode no longer stops generation early"""
+    print("Could not cancel a streamed Gemini response (google-generativeai internals changed); "
+          "fast mode will not save output tokens")
+
+
+# Fast mode: the score key and its complete numeric value in a streamed JSON response
+_SCORE_PATTERN = re.compile(r'"(?:average_)?score"\s*:\s*(-?\d+(?:\.\d+)?)(?=[\s,}])')
+
+
+# Total tokens of context shown to the context relevance metric, split evenly
+# across contexts (cl100k_base is a close proxy for Gemini's tokenizer). The default
+# (~120 tokens each for 5 contexts) stays at the old 500-character preview size.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("EVAL_CONTEXT_TOKEN_BUDGET", "600"))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _truncate_tokens(text: str, budget_tokens: int) -> str:
+    tokens = _get_encoding().encode(text)
+    if len(tokens) <= budget_tokens:
+        return text
+    return _get_encoding().decode(tokens[:budget_tokens]) + "..."
+
+
+def _format_contexts(contexts: List[str], preview: bool = False) -> str:
+    """Numbered context block for the prompts (optionally cut to the token budget)"""
+    if preview and contexts:
+        budget_tokens = CONTEXT_TOKEN_BUDGET // len(contexts)
+        return "\n\n".join([f"Context {i+1}:\n{_truncate_tokens(ctx, budget_tokens)}" for i, ctx in enumerate(contexts)])
+    return "\n\n".join([f"Context {i+1}:\n{ctx}" for i, ctx in enumerate(contexts)])
+
+
+def _validated(schema: Type[BaseModel], content: Optional[str]) -> Optional[str]:
+    """Return cached content only if it still matches the metric's schema"""
+    if content is None:
+        return None
+    try:
+        schema.model_validate_json(content)
+    except ValidationError:
+        return None
+    return content
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embedder():
+    """Small local embedding model, loaded on first use"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer("BAAI/bge-small-en-v1.5", device="cpu")
+
+
+# Embedding fast path: clear-cut relevance scores skip the LLM call
+EMBEDDING_PASS_SIMILARITY = 0.9
+EMBEDDING_FAIL_SIMILARITY = 0.2
+
+
+def _embedding_similarities(text: str, candidates: List[str]) -> np.ndarray:
+    """Cosine similarity of text against each candidate"""
+    vectors = _get_embedder().encode([text] + list(candidates), normalize_embeddings=True,
+                                     convert_to_numpy=True)
+    return vectors[1:] @ vectors[0]
+
+
+def _is_clear_cut(similarity: float) -> bool:
+    return similarity >= EMBEDDING_PASS_SIMILARITY or similarity <= EMBEDDING_FAIL_SIMILARITY
+
+
+class SemanticCache:
+    """
+    Cache of evaluation LLM responses, persisted as JSON lines.
+    - Exact match: SHA-256 of the full prompt
+    - Approximate match: same metric and byte-identical long fields (contexts,
+      sources, and anything past the embedder's max_seq_length, which it would
+      silently truncate), and every short field (query, answer) embeds within
+      `threshold` cosine similarity of a stored entry
+    """
+    
+    def __init__(self, path: str, threshold: float = 0.97):
+        self.path = path
+        self.threshold = threshold
+        self._exact: Dict[str, str] = {}
+        # Per group: stacked short-field embeddings (entries x fields x dim) and responses
+        self._vectors: Dict[str, List[np.ndarray]] = {}
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._responses: Dict[str, List[str]] = {}
+        self._load()
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    embeddings = entry["embeddings"]
+                    self._add(entry["key"], entry["group"],
+                              None if embeddings is None else np.asarray(embeddings, dtype=np.float32),
+                              entry["response"])
+                except (ValueError, KeyError):
+                    continue  # Skip truncated/corrupt lines and entries from older formats
+    
+    def _add(self, key: str, group: str, field_vectors: Optional[np.ndarray], response: str):
+        self._exact[key] = response
+        if field_vectors is None:
+            return
+        self._vectors.setdefault(group, []).append(field_vectors)
+        self._responses.setdefault(group, []).append(response)
+        self._matrices.pop(group, None)  # Restacked lazily on next lookup
+    
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def partition_fields(short_fields: Sequence[str],
+                         exact_fields: Sequence[str]) -> Tuple[List[str], List[str]]:
+        """Move short fields the embedder would truncate over to the exact-match fields"""
+        embedder = _get_embedder()
+        approx, exact = [], list(exact_fields)
+        for field in short_fields:
+            if len(embedder.tokenizer.encode(field)) > embedder.max_seq_length:
+                exact.append(field)
+            else:
+                approx.append(field)
+        return approx, exact
+    
+    @staticmethod
+    def group(metric: str, num_approx: int, exact_fields: Sequence[str]) -> str:
+        """Entries are only compared within the same metric and identical exact fields"""
+        return SemanticCache.key("\x00".join([metric, str(num_approx), *exact_fields]))
+    
+    @staticmethod
+    def embed_fields(fields: Sequence[str]) -> np.ndarray:
+        return _get_embedder().encode(list(fields), normalize_embeddings=True, convert_to_numpy=True)
+    
+    def get_exact(self, key: str) -> Optional[str]:
+        return self._exact.get(key)
+    
+    def get_similar(self, group: str, field_vectors: np.ndarray) -> Optional[str]:
+        if group not in self._vectors:
+            return None
+        matrix = self._matrices.get(group)
+        if matrix is None:
+            matrix = self._matrices[group] = np.stack(self._vectors[group])
+        # An entry matches only if every short field is near-identical
+        similarity = np.einsum("nfd,fd->nf", matrix, field_vectors).min(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] >= self.threshold:
+            return self._responses[group][best]
+        return None
+    
+    def put(self, metric: str, key: str, group: str,
+            field_vectors: Optional[np.ndarray], response: str):
+        self._add(key, group, field_vectors, response)
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "metric": metric,
+                    "key": key,
+                    "group": group,
+                    "embeddings": None if field_vectors is None else field_vectors.tolist(),
+                    "response": response
+                }) + "\n")
+        except OSError as e:
+            print(f"Could not persist evaluation cache entry: {e}")
+
+def _context_relevance_recommendation(context_rel: Dict) -> str:
+    return (
+        f"⚠️ LOW CONTEXT RELEVANCE ({context_rel['score']:.2f}): "
+        f"{context_rel['reasoning']}. "
+        "Try: Increase Top K to 8-10, reduce chunk size to 600-800, or use better embeddings model."
+    )
+
+
+def _faithfulness_recommendation(faithfulness: Dict) -> str:
+    # Faithfulness issues (most critical)
+    unsupported = faithfulness.get("unsupported_claims", [])
+    return (
+        f"🚨 LOW FAITHFULNESS ({faithfulness['score']:.2f}): "
+        f"{faithfulness['reasoning']}. "
+        f"Unsupported claims: {', '.join(unsupported) if unsupported else 'See details'}. "
+        "Try: Lower temperature to 0.3-0.5, improve prompt instructions, or check if documents contain the required info."
+    )
+
+
+def _answer_relevance_recommendation(answer_rel: Dict) -> str:
+    missing = answer_rel.get("missing_aspects", [])
+    return (
+        f"⚠️ LOW ANSWER RELEVANCE ({answer_rel['score']:.2f}): "
+        f"{answer_rel['reasoning']}. "
+        f"Missing: {', '.join(missing) if missing else 'See details'}. "
+        "Try: Rephrase query to be more specific, or check if documents actually contain the answer."
+    )
+
+
+def _citation_quality_recommendation(citation_qual: Dict) -> str:
+    return (
+        f"📄 POOR CITATION QUALITY ({citation_qual['score']:.2f}): "
+        f"{citation_qual['reasoning']}. "
+        "Try: Enhance prompt to explicitly require source citations for each claim."
+    )
 
-load_dotenv()
 
 class RAGEvaluator:
     """
     Enhanced RAG evaluator with:
-    - Structured JSON output for reliable parsing
+    - Structured (schema-validated) output, no free-text parsing
     - More detailed evaluation criteria
     - Transparent reasoning
     """
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.0  # Zero temperature for consistent evaluation
-        )
+    # Per metric, in order: context relevance, faithfulness, answer relevance, citation quality
+    _THRESHOLDS = np.array([0.7, 0.8, 0.7, 0.6])
+    # Overall score weights: 25% - are we retrieving the right info? 35% - is the answer
+    # grounded? (most critical) 25% - does it answer the question? 15% - are sources cited?
+    _WEIGHTS = np.array([0.25, 0.35, 0.25, 0.15])
+    _RECOMMENDATION_TEMPLATES = (
+        _context_relevance_recommendation,
+        _faithfulness_recommendation,
+        _answer_relevance_recommendation,
+        _citation_quality_recommendation,
+    )
     
-    def _safe_parse_json(self, text: str) -> Dict:
-        """Safely extract and parse JSON from LLM response"""
-        try:
-            # Try direct parsing first
-            return json.loads(text)
-        except:
-            # Look for JSON in markdown code blocks
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(1))
-            
-            # Look for JSON without code blocks
-            json_match = re.search(r'\{.*\}', text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            
-            # Return default structure if parsing fails
-            return {"score": 0.0, "verdict": "ERROR", "reasoning": "Failed to parse evaluation"}
+    def __init__(self, fast_mode: bool = False):
+        _load_env()
+        self.model = _get_model("gemini-2.5-flash", 0.0)  # Zero temperature for consistent evaluation
+        # Fast mode streams each metric and stops once its score is emitted (no reasoning)
+        self.fast_mode = fast_mode or os.getenv("EVAL_FAST_MODE", "false").lower() == "true"
+        # Repeated evaluations of the same (or near-identical) inputs skip the LLM call
+        self._prompt_cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._cache = SemanticCache(
+            path=os.path.expanduser(os.getenv("EVAL_CACHE_PATH", "~/.rag_eval_cache.jsonl")),
+            threshold=float(os.getenv("EVAL_CACHE_SIMILARITY", "0.97"))
+        )
     
-    def evaluate_context_relevance(self, query: str, contexts: List[str]) -> Dict[str, Any]:
+    async def _cached_ainvoke(self, metric: str, prompt: str, fields: Sequence[str],
+                              exact_fields: Sequence[str] = ()) -> Dict[str, Any]:
         """
-        Evaluates if retrieved contexts are relevant to the query using structured output
+        Return the structured LLM result for the metric's per-sample prompt, served
+        from the caches when possible. `fields` may match approximately (short inputs
+        such as the query/answer); `exact_fields` (contexts, sources) must match exactly.
         """
-        contexts_text = "\n\n".join([f"Context {i+1}:\n{ctx[:500]}..." for i, ctx in enumerate(contexts)])
+        # L0: in-process byte-identical prompt dedup (no hashing beyond one digest)
+        digest = _prompt_digest(prompt)
+        content = self._prompt_cache.get(digest)
+        if content is not None:
+            self._prompt_cache.move_to_end(digest)
+        else:
+            content = await self._semantic_cached_ainvoke(metric, prompt, fields, exact_fields)
+            if content is None:
+                return {"score": 0.0, "verdict": "ERROR", "reasoning": "Model returned no structured evaluation"}
+            self._prompt_cache[digest] = content
+            if len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+                self._prompt_cache.popitem(last=False)
+        return orjson.loads(content)
+    
+    async def _semantic_cached_ainvoke(self, metric: str, prompt: str, fields: Sequence[str],
+                                       exact_fields: Sequence[str]) -> Optional[str]:
+        schema = METRIC_SCHEMAS[metric]
+        key = self._cache.key(prompt)
+        cached = _validated(schema, self._cache.get_exact(key))
+        if cached is not None:
+            return cached
         
-        prompt = f"""Evaluate how relevant each retrieved context is to the user's query. 
-
-QUERY: {query}
-
-CONTEXTS:
-{contexts_text}
-
-For each context, rate its relevance on a scale of 0.0 to 1.0 where:
-- 0.0-0.3: Completely irrelevant
-- 0.4-0.6: Somewhat relevant but missing key information
-- 0.7-0.8: Relevant with some useful information
-- 0.9-1.0: Highly relevant and directly answers the query
-
-Respond ONLY with a JSON object in this exact format:
-{{
-  "individual_scores": [0.9, 0.7, 0.5, 0.3, 0.2],
-  "average_score": 0.52,
-  "reasoning": "Context 1 and 2 directly address the budget question with specific numbers. Context 3 mentions budget but lacks details. Contexts 4 and 5 discuss unrelated project timeline information.",
-  "verdict": "PASS or FAIL (PASS if average >= 0.7)"
-}}"""
+        approx_fields, exact_fields = self._cache.partition_fields(fields, exact_fields)
+        group = self._cache.group(metric, len(approx_fields), exact_fields)
+        field_vectors = None
+        if approx_fields:
+            field_vectors = self._cache.embed_fields(approx_fields)
+            cached = _validated(schema, self._cache.get_similar(group, field_vectors))
+            if cached is not None:
+                return cached
         
-        response = self.llm.invoke(prompt)
-        result = self._safe_parse_json(response.content)
+        if self.fast_mode and metric != "all":
+            return await self._stream_score(metric, prompt)
         
+        response = await self.model.generate_content_async(
+            prompt, generation_config=_generation_config(metric)
+        )
+        try:
+            # .text raises ValueError when the response was blocked or empty
+            content = schema.model_validate_json(response.text).model_dump_json()
+        except (ValueError, ValidationError) as e:
+            print(f"Evaluation response for {metric} rejected: {e}")
+            return None
+        self._cache.put(metric, key, group, field_vectors, content)
+        return content
+    
+    async def _stream_score(self, metric: str, prompt: str) -> Optional[str]:
+        """
+        Stream the raw response and stop as soon as the score is complete.
+        Partial results are not written to the persistent cache.
+        """
+        score_key = "average_score" if metric == "context_relevance" else "score"
+        
+        # No response schema here: the API would emit its properties alphabetically
+        # (reasoning/claim lists before "score"). Plain JSON mode follows the prompt.
+        prompt += f'\n\nRespond with a JSON object whose first key is "{score_key}" (0.0-1.0).'
+        stream = await self.model.generate_content_async(prompt, stream=True)
+        buf = ""
+        try:
+            async for chunk in stream:
+                try:
+                    # .text raises ValueError on chunks without a text part (blocked/final)
+                    buf += chunk.text
+                except ValueError as e:
+                    print(f"Evaluation response for {metric} rejected: {e}")
+                    return None
+                match = _SCORE_PATTERN.search(buf)
+                if match:
+                    return orjson.dumps({
+                        score_key: float(match.group(1)),
+                        "reasoning": "Not generated (fast mode)"
+                    }).decode()
+        finally:
+            # Stop generation server-side once the score is in (no-op if the stream finished)
+            await _close_stream(stream)
+        return None
+    
+    @staticmethod
+    def _context_relevance_result(result: Dict[str, Any]) -> Dict[str, Any]:
         # Ensure all fields exist
         score = result.get("average_score", 0.0)
         return {
@@ -82,36 +491,8 @@ Respond ONLY with a JSON object in this exact format:
             "threshold": 0.7
         }
     
-    def evaluate_faithfulness(self, answer: str, contexts: List[str]) -> Dict[str, Any]:
-        """
-        Evaluates if the answer is grounded in the contexts (checks for hallucinations)
-        """
-        contexts_text = "\n\n".join([f"Context {i+1}:\n{ctx}" for i, ctx in enumerate(contexts)])
-        
-        prompt = f"""Evaluate if the answer is faithful to the provided contexts. Check each claim in the answer against the contexts.
-
-CONTEXTS:
-{contexts_text}
-
-ANSWER: {answer}
-
-Analyze each statement in the answer:
-- Is it directly supported by the contexts?
-- Is it a reasonable inference from the contexts?
-- Is it added information not in contexts (hallucination)?
-
-Respond ONLY with a JSON object:
-{{
-  "score": 0.85,
-  "supported_claims": ["Budget is $500K (from Context 1)", "Timeline is 6 months (from Context 2)"],
-  "unsupported_claims": ["The project includes 10 team members (NOT mentioned in contexts)"],
-  "reasoning": "Most claims are well-supported, but team size claim appears to be hallucinated",
-  "verdict": "FAITHFUL or UNFAITHFUL (FAITHFUL if score >= 0.8)"
-}}"""
-        
-        response = self.llm.invoke(prompt)
-        result = self._safe_parse_json(response.content)
-        
+    @staticmethod
+    def _faithfulness_result(result: Dict[str, Any]) -> Dict[str, Any]:
         score = result.get("score", 0.0)
         return {
             "metric": "faithfulness",
@@ -123,34 +504,8 @@ Respond ONLY with a JSON object:
             "threshold": 0.8
         }
     
-    def evaluate_answer_relevance(self, query: str, answer: str) -> Dict[str, Any]:
-        """
-        Evaluates if the answer actually addresses the user's question
-        """
-        prompt = f"""Evaluate if the answer is relevant to and addresses the user's query.
-
-QUERY: {query}
-
-ANSWER: {answer}
-
-Consider:
-- Does the answer directly address what was asked?
-- Is the answer complete or does it miss important aspects of the question?
-- Does it contain unnecessary information not related to the query?
-
-Respond ONLY with a JSON object:
-{{
-  "score": 0.9,
-  "addresses_query": true,
-  "missing_aspects": ["Doesn't mention the deadline which was part of the question"],
-  "irrelevant_content": ["Discusses team structure which wasn't asked about"],
-  "reasoning": "Answer provides the requested budget information clearly but adds unnecessary team details",
-  "verdict": "RELEVANT or IRRELEVANT (RELEVANT if score >= 0.7)"
-}}"""
-        
-        response = self.llm.invoke(prompt)
-        result = self._safe_parse_json(response.content)
-        
+    @staticmethod
+    def _answer_relevance_result(result: Dict[str, Any]) -> Dict[str, Any]:
         score = result.get("score", 0.0)
         return {
             "metric": "answer_relevance",
@@ -163,11 +518,110 @@ Respond ONLY with a JSON object:
             "threshold": 0.7
         }
     
-    def evaluate_citation_quality(self, answer: str, sources: List[Dict]) -> Dict[str, Any]:
+    @staticmethod
+    def _citation_quality_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        score = result.get("score", 0.0)
+        return {
+            "metric": "citation_quality",
+            "score": score,
+            "has_citations": result.get("has_citations", False),
+            "citation_examples": result.get("citation_examples", []),
+            "uncited_claims": result.get("uncited_claims", []),
+            "reasoning": result.get("reasoning", "No reasoning provided"),
+            "verdict": "GOOD" if score >= 0.6 else "POOR",
+            "threshold": 0.6
+        }
+    
+    async def evaluate_context_relevance(self, query: str, contexts: List[str],
+                                         contexts_text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Evaluates if retrieved contexts are relevant to the query using structured output.
+        Clear-cut cases are scored from embedding similarity without an LLM call (only
+        on direct calls and in fast mode; comprehensive evaluation uses evaluate_all).
+        contexts_text: precomputed _format_contexts(contexts, preview=True)
+        """
+        if contexts:
+            # Off the event loop, so concurrent metric requests go out meanwhile
+            similarities = await asyncio.to_thread(_embedding_similarities, query, contexts)
+            mean = float(similarities.mean())
+            if _is_clear_cut(mean):
+                result = self._context_relevance_result({
+                    "average_score": mean,
+                    "individual_scores": [round(float(x), 3) for x in similarities],
+                    "reasoning": f"Mean embedding similarity between query and contexts is {mean:.2f}"
+                })
+                result["max_similarity"] = round(float(similarities.max()), 3)
+                result["source"] = "embedding_fast_path"
+                return result
+        
+        if contexts_text is None:
+            contexts_text = _format_contexts(contexts, preview=True)
+        
+        prompt = f"""Evaluate how relevant each retrieved context is to the user's query. 
+
+QUERY: {query}
+
+CONTEXTS:
+{contexts_text}
+
+{_CONTEXT_RELEVANCE_RUBRIC}"""
+        
+        result = await self._cached_ainvoke("context_relevance", prompt, (query,), (contexts_text,))
+        return self._context_relevance_result(result)
+    
+    async def evaluate_faithfulness(self, answer: str, contexts: List[str],
+                                    contexts_text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Evaluates if the answer is grounded in the contexts (checks for hallucinations).
+        contexts_text: precomputed _format_contexts(contexts)
+        """
+        if contexts_text is None:
+            contexts_text = _format_contexts(contexts)
+        
+        prompt = f"""Evaluate if the answer is faithful to the provided contexts. Check each claim in the answer against the contexts.
+
+CONTEXTS:
+{contexts_text}
+
+ANSWER: {answer}
+
+{_FAITHFULNESS_RUBRIC}"""
+        
+        result = await self._cached_ainvoke("faithfulness", prompt, (answer,), (contexts_text,))
+        return self._faithfulness_result(result)
+    
+    async def evaluate_answer_relevance(self, query: str, answer: str) -> Dict[str, Any]:
+        """
+        Evaluates if the answer actually addresses the user's question.
+        Clear-cut cases are scored from embedding similarity without an LLM call (only
+        on direct calls and in fast mode; comprehensive evaluation uses evaluate_all).
+        """
+        similarity = float((await asyncio.to_thread(_embedding_similarities, query, [answer]))[0])
+        if _is_clear_cut(similarity):
+            result = self._answer_relevance_result({
+                "score": similarity,
+                "addresses_query": similarity >= EMBEDDING_PASS_SIMILARITY,
+                "reasoning": f"Embedding similarity between query and answer is {similarity:.2f}"
+            })
+            result["source"] = "embedding_fast_path"
+            return result
+        
+        prompt = f"""Evaluate if the answer is relevant to and addresses the user's query.
+
+QUERY: {query}
+
+ANSWER: {answer}
+
+{_ANSWER_RELEVANCE_RUBRIC}"""
+        
+        result = await self._cached_ainvoke("answer_relevance", prompt, (query, answer))
+        return self._answer_relevance_result(result)
+    
+    async def evaluate_citation_quality(self, answer: str, sources: List[Dict]) -> Dict[str, Any]:
         """
         NEW: Evaluates if the answer properly cites its sources
         """
-        sources_text = "\n".join([f"- {s['file']}, Page {s['page']}" for s in sources])
+        sources_text = "\n".join(f"- {s['file']}, Page {s['page']}" for s in sources)
         
         prompt = f"""Evaluate how well the answer cites its sources.
 
@@ -176,64 +630,106 @@ AVAILABLE SOURCES:
 
 ANSWER: {answer}
 
-Check:
-- Does the answer reference specific sources when making claims?
-- Are the citations appropriate and helpful?
-- Can we trace claims back to sources?
-
-Respond ONLY with a JSON object:
-{{
-  "score": 0.75,
-  "has_citations": true,
-  "citation_examples": ["According to Source 1..."],
-  "uncited_claims": ["The deadline claim lacks a source reference"],
-  "reasoning": "Answer cites sources for budget info but not for deadline",
-  "verdict": "GOOD or POOR (GOOD if score >= 0.6)"
-}}"""
+{_CITATION_QUALITY_RUBRIC}"""
         
-        response = self.llm.invoke(prompt)
-        result = self._safe_parse_json(response.content)
+        result = await self._cached_ainvoke("citation_quality", prompt, (answer,), (sources_text,))
+        return self._citation_quality_result(result)
+    
+    async def evaluate_all(self, query: str, answer: str,
+                           contexts: List[str], sources: List[Dict],
+                           contexts_text: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Evaluates all four metrics in a single LLM call: contexts are sent once
+        and the model returns every score in one structured response.
+        contexts_text: precomputed _format_contexts(contexts)
+        """
+        if contexts_text is None:
+            contexts_text = _format_contexts(contexts)
+        sources_text = "\n".join(f"- {s['file']}, Page {s['page']}" for s in sources)
         
-        score = result.get("score", 0.0)
+        prompt = f"""Evaluate a RAG system's answer on four independent metrics.
+
+QUERY: {query}
+
+CONTEXTS:
+{contexts_text}
+
+AVAILABLE SOURCES:
+{sources_text}
+
+ANSWER: {answer}
+
+1. CONTEXT RELEVANCE - how relevant each retrieved context is to the query.
+{_CONTEXT_RELEVANCE_RUBRIC}
+
+2. FAITHFULNESS - whether each claim in the answer is grounded in the contexts.
+{_FAITHFULNESS_RUBRIC}
+
+3. ANSWER RELEVANCE - whether the answer addresses the query.
+{_ANSWER_RELEVANCE_RUBRIC}
+
+4. CITATION QUALITY - how well the answer cites its sources.
+{_CITATION_QUALITY_RUBRIC}"""
+        
+        result = await self._cached_ainvoke(
+            "all", prompt, (query, answer), (contexts_text, sources_text)
+        )
+        # On failure the ERROR result stands in for every metric
         return {
-            "metric": "citation_quality",
-            "score": score,
-            "has_citations": result.get("has_citations", False),
-            "citation_examples": result.get("citation_examples", []),
-            "uncited_claims": result.get("uncited_claims", []),
-            "reasoning": result.get("reasoning", "No reasoning provided"),
-            "verdict": "GOOD" if score >= 0.6 else "POOR",
-            "threshold": 0.6
+            "context_relevance": self._context_relevance_result(result.get("context_relevance", result)),
+            "faithfulness": self._faithfulness_result(result.get("faithfulness", result)),
+            "answer_relevance": self._answer_relevance_result(result.get("answer_relevance", result)),
+            "citation_quality": self._citation_quality_result(result.get("citation_quality", result))
         }
     
     def comprehensive_evaluation(self, query: str, answer: str, 
                                  contexts: List[str], 
                                  sources: List[Dict]) -> Dict[str, Any]:
         """
+        Synchronous entry point for acomprehensive_evaluation
+        """
+        # Works from plain code and from inside a running loop (e.g. a FastAPI handler)
+        future = asyncio.run_coroutine_threadsafe(
+            self.acomprehensive_evaluation(query, answer, contexts, sources),
+            _get_event_loop()
+        )
+        return future.result()
+    
+    async def acomprehensive_evaluation(self, query: str, answer: str, 
+                                        contexts: List[str], 
+                                        sources: List[Dict]) -> Dict[str, Any]:
+        """
         Runs all evaluation metrics with transparent reasoning
         """
         print("\n🔍 Running RAG Evaluation...")
         
-        # Run all metrics
-        context_rel = self.evaluate_context_relevance(query, contexts)
-        print(f"  ✓ Context Relevance: {context_rel['score']:.2f}")
+        # Build the context block once and share it across metrics
+        contexts_text = _format_contexts(contexts)
         
-        faithfulness = self.evaluate_faithfulness(answer, contexts)
+        if self.fast_mode:
+            # Four concurrent streamed calls, each cut off after its score
+            context_rel, faithfulness, answer_rel, citation_qual = await asyncio.gather(
+                self.evaluate_context_relevance(query, contexts, _format_contexts(contexts, preview=True)),
+                self.evaluate_faithfulness(answer, contexts, contexts_text),
+                self.evaluate_answer_relevance(query, answer),
+                self.evaluate_citation_quality(answer, sources)
+            )
+        else:
+            # Run all metrics (one batched LLM call)
+            metrics = await self.evaluate_all(query, answer, contexts, sources, contexts_text)
+            context_rel = metrics["context_relevance"]
+            faithfulness = metrics["faithfulness"]
+            answer_rel = metrics["answer_relevance"]
+            citation_qual = metrics["citation_quality"]
+        print(f"  ✓ Context Relevance: {context_rel['score']:.2f}")
         print(f"  ✓ Faithfulness: {faithfulness['score']:.2f}")
-        
-        answer_rel = self.evaluate_answer_relevance(query, answer)
         print(f"  ✓ Answer Relevance: {answer_rel['score']:.2f}")
-        
-        citation_qual = self.evaluate_citation_quality(answer, sources)
         print(f"  ✓ Citation Quality: {citation_qual['score']:.2f}")
         
         # Calculate weighted overall score
-        overall_score = (
-            context_rel["score"] * 0.25 +      # 25% - Are we retrieving the right info?
-            faithfulness["score"] * 0.35 +      # 35% - Is the answer grounded? (most critical)
-            answer_rel["score"] * 0.25 +        # 25% - Does it answer the question?
-            citation_qual["score"] * 0.15       # 15% - Are sources properly cited?
-        )
+        overall_score = float(np.array([
+            context_rel["score"], faithfulness["score"], answer_rel["score"], citation_qual["score"]
+        ]) @ self._WEIGHTS)
         
         # Generate detailed recommendations
         recommendations = self._generate_detailed_recommendations(
@@ -260,49 +756,20 @@ Respond ONLY with a JSON object:
                                           answer_rel: Dict,
                                           citation_qual: Dict) -> List[str]:
         """Generate specific, actionable recommendations"""
-        recommendations = []
-        
-        # Context relevance issues
-        if context_rel["score"] < 0.7:
-            recommendations.append(
-                f"⚠️ LOW CONTEXT RELEVANCE ({context_rel['score']:.2f}): "
-                f"{context_rel['reasoning']}. "
-                "Try: Increase Top K to 8-10, reduce chunk size to 600-800, or use better embeddings model."
-            )
-        
-        # Faithfulness issues (most critical)
-        if faithfulness["score"] < 0.8:
-            unsupported = faithfulness.get("unsupported_claims", [])
-            recommendations.append(
-                f"🚨 LOW FAITHFULNESS ({faithfulness['score']:.2f}): "
-                f"{faithfulness['reasoning']}. "
-                f"Unsupported claims: {', '.join(unsupported) if unsupported else 'See details'}. "
-                "Try: Lower temperature to 0.3-0.5, improve prompt instructions, or check if documents contain the required info."
-            )
+        metrics = (context_rel, faithfulness, answer_rel, citation_qual)
+        scores = np.array([m["score"] for m in metrics])
         
-        # Answer relevance issues
-        if answer_rel["score"] < 0.7:
-            missing = answer_rel.get("missing_aspects", [])
-            recommendations.append(
-                f"⚠️ LOW ANSWER RELEVANCE ({answer_rel['score']:.2f}): "
-                f"{answer_rel['reasoning']}. "
-                f"Missing: {', '.join(missing) if missing else 'See details'}. "
-                "Try: Rephrase query to be more specific, or check if documents actually contain the answer."
-            )
-        
-        # Citation quality issues
-        if citation_qual["score"] < 0.6:
-            recommendations.append(
-                f"📄 POOR CITATION QUALITY ({citation_qual['score']:.2f}): "
-                f"{citation_qual['reasoning']}. "
-                "Try: Enhance prompt to explicitly require source citations for each claim."
-            )
+        # One vectorized threshold check; only failing metrics get formatted
+        recommendations = [
+            self._RECOMMENDATION_TEMPLATES[i](metrics[i])
+            for i in np.nonzero(scores < self._THRESHOLDS)[0]
+        ]
         
         # If everything is good
         if not recommendations:
             recommendations.append(
                 f"✅ EXCELLENT RESPONSE! All metrics above threshold. "
-                f"Overall score: {context_rel['score'] * 0.25 + faithfulness['score'] * 0.35 + answer_rel['score'] * 0.25 + citation_qual['score'] * 0.15:.2f}"
+                f"Overall score: {float(scores @ self._WEIGHTS):.2f}"
             )
         
-        return recommendations
\ No newline at end of file
+        return recommendations
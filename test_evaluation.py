@@ -7,13 +7,34 @@ This script demonstrates the RAG evaluation feature by:
 3. Displaying results in a formatted way
 """
 
-import requests
-import json
-from typing import Dict, Any
+import os
+import sys
+import asyncio
+import atexit
+import functools
+from typing import Dict, Any, List
 
 # Configuration
 API_BASE_URL = "http://localhost:8000"
 CHAT_ENDPOINT = f"{API_BASE_URL}/chat"
+BATCH_CONCURRENCY = 8
+
+# HTTP/JSON libraries are imported on first request so the menu shows up instantly
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """
+    One pooled client reused across requests (no handshake per query). HTTP/2 is
+    only negotiated over TLS (ALPN), so against the default http:// URL requests
+    use HTTP/1.1 keep-alive; http2=True needs httpx[http2] installed.
+    """
+    import httpx
+    client = httpx.Client(
+        http2=True,
+        timeout=60.0,
+        limits=httpx.Limits(max_keepalive_connections=16)
+    )
+    atexit.register(client.close)
+    return client
 
 # ANSI color codes for terminal output
 class Colors:
@@ -35,16 +56,26 @@ TEST_QUERIES = [
     "Insert your query4 here",
 ]
 
+# Progress bar pieces, sliced per metric instead of rebuilt
+BAR_LENGTH = 40
+_BAR_FILLED = '█' * (BAR_LENGTH + 1)
+_BAR_EMPTY = '░' * (BAR_LENGTH + 1)
+SEPARATOR = "\n" + "="*80 + "\n"
+
 def print_separator():
     """Print a visual separator"""
-    print("\n" + "="*80 + "\n")
+    print(SEPARATOR)
+
+def format_header(text: str) -> str:
+    """Format a header line"""
+    return f"{Colors.BOLD}{Colors.HEADER}{text}{Colors.ENDC}"
 
 def print_header(text: str):
     """Print a formatted header"""
-    print(f"{Colors.BOLD}{Colors.HEADER}{text}{Colors.ENDC}")
+    print(format_header(text))
 
-def print_metric(name: str, score: float, verdict: str):
-    """Print a formatted metric"""
+def format_metric(name: str, score: float, verdict: str) -> List[str]:
+    """Format a metric as output lines"""
     # Color based on score
     if score >= 0.7:
         color = Colors.OKGREEN
@@ -54,15 +85,20 @@ def print_metric(name: str, score: float, verdict: str):
         color = Colors.FAIL
     
     # Create progress bar
-    bar_length = 40
-    filled_length = int(bar_length * score)
-    bar = '█' * filled_length + '░' * (bar_length - filled_length)
+    filled_length = min(max(int(BAR_LENGTH * score), 0), BAR_LENGTH)
+    bar = _BAR_FILLED[:filled_length] + _BAR_EMPTY[:BAR_LENGTH - filled_length]
     
     # Verdict color
     verdict_color = Colors.OKGREEN if 'PASS' in verdict or 'FAITHFUL' in verdict or 'RELEVANT' in verdict else Colors.FAIL
     
-    print(f"  {Colors.BOLD}{name}:{Colors.ENDC}")
-    print(f"  {color}{bar}{Colors.ENDC} {color}{score*100:.1f}%{Colors.ENDC} {verdict_color}[{verdict}]{Colors.ENDC}")
+    return [
+        f"  {Colors.BOLD}{name}:{Colors.ENDC}",
+        f"  {color}{bar}{Colors.ENDC} {color}{score*100:.1f}%{Colors.ENDC} {verdict_color}[{verdict}]{Colors.ENDC}"
+    ]
+
+def print_metric(name: str, score: float, verdict: str):
+    """Print a formatted metric"""
+    sys.stdout.write("\n".join(format_metric(name, score, verdict)) + "\n")
 
 def send_chat_request(query: str, evaluate: bool = True, top_k: int = 5, temperature: float = 0.7) -> Dict[str, Any]:
     """
@@ -84,68 +120,111 @@ def send_chat_request(query: str, evaluate: bool = True, top_k: int = 5, tempera
         "evaluate": evaluate
     }
     
+    import httpx
+    import orjson
+    
     try:
-        response = requests.post(CHAT_ENDPOINT, json=payload)
+        response = _get_client().post(CHAT_ENDPOINT, json=payload)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(response.content)
+    except httpx.HTTPError as e:
+        print(f"{Colors.FAIL}Error: {e}{Colors.ENDC}")
+        return None
+
+async def send_chat_request_async(session: "httpx.AsyncClient", query: str, evaluate: bool = True,
+                                  top_k: int = 5, temperature: float = 0.7,
+                                  semaphore: asyncio.Semaphore = None) -> Dict[str, Any]:
+    """
+    Async variant of send_chat_request for batch mode
+    
+    Args:
+        session: Shared httpx async client
+        query: The question to ask
+        evaluate: Whether to enable RAG evaluation
+        top_k: Number of chunks to retrieve
+        temperature: LLM temperature
+        semaphore: Optional semaphore bounding in-flight requests
+    
+    Returns:
+        API response as dictionary
+    """
+    payload = {
+        "message": query,
+        "top_k": top_k,
+        "temperature": temperature,
+        "evaluate": evaluate
+    }
+    
+    import httpx
+    import orjson
+    
+    try:
+        if semaphore is None:
+            response = await session.post(CHAT_ENDPOINT, json=payload)
+        else:
+            async with semaphore:
+                response = await session.post(CHAT_ENDPOINT, json=payload)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    except httpx.HTTPError as e:
         print(f"{Colors.FAIL}Error: {e}{Colors.ENDC}")
         return None
 
 def display_response(query: str, data: Dict[str, Any]):
-    """Display the API response in a formatted way"""
-    print_separator()
-    print_header(f"QUERY: {query}")
+    """Display the API response in a formatted way (one write per response)"""
+    lines = [SEPARATOR, format_header(f"QUERY: {query}")]
     
     # Display answer
-    print(f"\n{Colors.BOLD}{Colors.OKCYAN}ANSWER:{Colors.ENDC}")
-    print(f"{data.get('response', 'No response')}\n")
+    lines.append(f"\n{Colors.BOLD}{Colors.OKCYAN}ANSWER:{Colors.ENDC}")
+    lines.append(f"{data.get('response', 'No response')}\n")
     
     # Display sources
     sources = data.get('sources', [])
     if sources:
-        print(f"{Colors.BOLD}{Colors.OKBLUE}SOURCES:{Colors.ENDC}")
+        lines.append(f"{Colors.BOLD}{Colors.OKBLUE}SOURCES:{Colors.ENDC}")
         for source in sources:
-            file_name = source['file'].split('\\')[-1].split('/')[-1]
-            print(f"  📄 {file_name} - Page {source['page']}")
-        print()
+            file_name = os.path.basename(source['file'].replace('\\', '/'))
+            lines.append(f"  📄 {file_name} - Page {source['page']}")
+        lines.append("")
     
     # Display evaluation metrics
     evaluation = data.get('evaluation')
     if evaluation:
-        print(f"{Colors.BOLD}{Colors.HEADER}EVALUATION METRICS:{Colors.ENDC}\n")
+        lines.append(f"{Colors.BOLD}{Colors.HEADER}EVALUATION METRICS:{Colors.ENDC}\n")
         
         # Overall score
         overall_score = evaluation.get('overall_score', 0)
         overall_verdict = evaluation.get('overall_verdict', 'UNKNOWN')
         
         verdict_color = Colors.OKGREEN if overall_verdict == 'PASS' else Colors.FAIL
-        print(f"  {Colors.BOLD}Overall Score: {Colors.ENDC}{verdict_color}{overall_score*100:.1f}%{Colors.ENDC} {verdict_color}[{overall_verdict}]{Colors.ENDC}\n")
+        lines.append(f"  {Colors.BOLD}Overall Score: {Colors.ENDC}{verdict_color}{overall_score*100:.1f}%{Colors.ENDC} {verdict_color}[{overall_verdict}]{Colors.ENDC}\n")
         
         # Individual metrics
         metrics = evaluation.get('metrics', {})
         
         if 'context_relevance' in metrics:
             metric = metrics['context_relevance']
-            print_metric('Context Relevance', metric['score'], metric['verdict'])
-            print()
+            lines.extend(format_metric('Context Relevance', metric['score'], metric['verdict']))
+            lines.append("")
         
         if 'faithfulness' in metrics:
             metric = metrics['faithfulness']
-            print_metric('Faithfulness', metric['score'], metric['verdict'])
-            print()
+            lines.extend(format_metric('Faithfulness', metric['score'], metric['verdict']))
+            lines.append("")
         
         if 'answer_relevance' in metrics:
             metric = metrics['answer_relevance']
-            print_metric('Answer Relevance', metric['score'], metric['verdict'])
-            print()
+            lines.extend(format_metric('Answer Relevance', metric['score'], metric['verdict']))
+            lines.append("")
         
         # Recommendations
         recommendations = evaluation.get('recommendations', [])
         if recommendations:
-            print(f"{Colors.BOLD}RECOMMENDATIONS:{Colors.ENDC}")
+            lines.append(f"{Colors.BOLD}RECOMMENDATIONS:{Colors.ENDC}")
             for rec in recommendations:
-                print(f"  {rec}")
+                lines.append(f"  {rec}")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def run_evaluation_demo():
     """Run the evaluation demonstration"""
@@ -182,6 +261,38 @@ def run_evaluation_demo():
     print("  2. Enable the 'Enable Evaluation' checkbox")
     print("  3. Ask your own questions and see metrics in real-time")
 
+async def _gather_batch(queries) -> list:
+    """Send all queries concurrently, bounded by BATCH_CONCURRENCY"""
+    import httpx
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    # HTTP/2 multiplexing applies to https:// endpoints only (see _get_client)
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=BATCH_CONCURRENCY)
+    ) as session:
+        return await asyncio.gather(*[
+            send_chat_request_async(session, q, evaluate=True, semaphore=semaphore)
+            for q in queries
+        ])
+
+def run_evaluation_batch():
+    """Run all test queries concurrently without interactive pauses"""
+    print_header("RAG EVALUATION BATCH MODE")
+    print(f"\nSending {len(TEST_QUERIES)} queries concurrently...\n")
+    
+    results = asyncio.run(_gather_batch(TEST_QUERIES))
+    
+    for query, data in zip(TEST_QUERIES, results):
+        if data:
+            display_response(query, data)
+        else:
+            print(f"{Colors.FAIL}Failed to get response for query: {query}{Colors.ENDC}")
+    
+    print_separator()
+    print_header("BATCH COMPLETE!")
+
 def run_single_query_test(query: str = None):
     """Test a single query with detailed output"""
     if query is None:
@@ -196,7 +307,8 @@ def run_single_query_test(query: str = None):
         # Also show raw JSON for debugging
         print_separator()
         print_header("RAW JSON RESPONSE")
-        print(json.dumps(data, indent=2))
+        import orjson
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
     else:
         print(f"{Colors.FAIL}Failed to get response{Colors.ENDC}")
 
@@ -210,8 +322,9 @@ def main():
     print("  1. Run full demo with test queries")
     print("  2. Test a single query")
     print("  3. Exit")
+    print("  4. Run batch mode (all test queries concurrently)")
     
-    choice = input(f"\n{Colors.OKCYAN}Enter choice (1-3): {Colors.ENDC}")
+    choice = input(f"\n{Colors.OKCYAN}Enter choice (1-4): {Colors.ENDC}")
     
     if choice == '1':
         run_evaluation_demo()
@@ -219,6 +332,8 @@ def main():
         run_single_query_test()
     elif choice == '3':
         print("Goodbye!")
+    elif choice == '4':
+        run_evaluation_batch()
     else:
         print(f"{Colors.WARNING}Invalid choice{Colors.ENDC}")
 